@@ -1,14 +1,18 @@
 import os
 import io
+import csv
 import zipfile
 import streamlit as st
-import pandas as pd
 import requests
 import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from urllib.parse import urljoin
 from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from component_lister import ComponentLister
 from dependency_analyst import DependencyAnalyst
 
@@ -18,21 +22,69 @@ DEFAULT_SINGLE_EXP_MANAGER_LIMIT = int(os.getenv("SINGLE_EXP_MANAGER_LIMIT", 100
 DEFAULT_MULTIPLE_EXP_MANAGER_LIMIT = int(os.getenv("MULTIPLE_EXP_MANAGER_LIMIT", 10000))
 DEFAULT_DATA_MANAGER_LIMIT = int(os.getenv("DATA_MANAGER_LIMIT", 10000))
 DEFAULT_VISUAL_PROGRAMMING_LIMIT = int(os.getenv("VISUAL_PROGRAMMING_LIMIT", 10000))
+# Deflate level for the download; CSV text compresses well even at the fastest level
+ZIP_COMPRESSLEVEL = 1
+# Id columns are written as strings in Parquet exports, since their type varies between components
+ID_COLUMNS = ("id", "component_id")
+# How long a login token is reused before logging in again, in seconds
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", 3600))
+# How long fetched component lists are reused across reruns, in seconds
+FETCH_CACHE_TTL = int(os.getenv("FETCH_CACHE_TTL", 3600))
+# Send the date range to the API as an updated_at filter (only for endpoints that honour it)
+SERVER_SIDE_DATE_FILTER = os.getenv("SERVER_SIDE_DATE_FILTER", "false").strip().lower() in ("1", "true", "yes")
 
-# Utility for timestamp conversion
-INDO_TZ = datetime.now().astimezone().tzinfo
+# Exported timestamps are local time in this format
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+# Largest epoch value (in seconds) formatted; one day short of year 9999 so the local offset cannot overflow it
+MAX_EPOCH_SECONDS = 253402214400
 
-def convert_timestamp(ts):
-    if not ts:
-        return ""
+def format_timestamps(values):
+    """Format a column of epoch seconds/milliseconds as local "%d-%m-%Y %H:%M:%S" strings, "" where missing or invalid."""
+    import pandas as pd
+
+    ts = pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce").astype("float64")
+    ts = ts.where(ts != 0)  # falsy timestamps render empty
+    ts = ts.where(ts <= 1e12, ts / 1000.0)
+    ts = ts.where(ts.abs() < MAX_EPOCH_SECONDS)  # beyond what datetime can represent
+    # datetime.fromtimestamp applies the local offset per value (DST included) and formats far faster than .dt.strftime
+    return [datetime.fromtimestamp(v).strftime(TIMESTAMP_FORMAT) if v == v else "" for v in ts.tolist()]
+
+def to_columns(data):
+    # Build the four exported columns directly instead of a full per-row dict
+    return {
+        "id": [it.get("id") for it in data],
+        "name": [it.get("name") for it in data],
+        "created_at": format_timestamps([it.get("created_at") for it in data]),
+        "updated_at": format_timestamps([it.get("updated_at") for it in data]),
+    }
+
+def write_csv(fh, columns):
+    """Write a dict of equal-length column lists to the binary file `fh` as CSV, without going through pandas."""
+    with io.TextIOWrapper(fh, encoding="utf-8", newline="") as text:
+        # Match the "\n" line endings pandas to_csv wrote before (csv.writer defaults to "\r\n")
+        writer = csv.writer(text, lineterminator="\n")
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
+
+def write_table(fh, table, fmt):
+    """Write a dict of column lists to the binary file `fh` as CSV or zstd-compressed Parquet."""
+    if fmt == "CSV":
+        write_csv(fh, table)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Parquet columns need one type; ids may be ints for some components and strings for others
+    table = {
+        column: [None if v is None else str(v) for v in values] if column in ID_COLUMNS else values
+        for column, values in table.items()
+    }
     try:
-        v = float(ts)
-        if v > 1e12:
-            v = v / 1000.0
-        dt = datetime.fromtimestamp(v)
-        return dt.strftime("%d-%m-%Y %H:%M:%S")
-    except Exception:
-        return ""
+        arrow_table = pa.table(table)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise RuntimeError(f"Cannot convert to Parquet: {e}") from e
+    pq.write_table(arrow_table, fh, compression="zstd")
 
 def filter_by_updated_at(items, start, end):
     if not start and not end:
@@ -61,7 +113,64 @@ def filter_by_updated_at(items, start, end):
         filtered.append(it)
     return filtered
 
+def run_concurrently(tasks, on_done=None):
+    """Run independent zero-argument callables in parallel and return their results under the same keys.
+
+    `on_done(name, error, finished_count)` is called on the calling thread as each task finishes, in completion
+    order; `error` is None on success. Every task runs to the end, then the first error (in task order) is raised.
+    Worker threads inherit the current script run context so Streamlit caching works inside them.
+    """
+    ctx = get_script_run_ctx()
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=len(tasks), initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        futures = {executor.submit(task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            error = future.exception()
+            if error is None:
+                results[name] = future.result()
+            else:
+                errors[name] = error
+            if on_done is not None:
+                on_done(name, error, len(results) + len(errors))
+    for name in tasks:
+        if name in errors:
+            raise errors[name]
+    return results
+
+@st.cache_resource(ttl=TOKEN_TTL_SECONDS, show_spinner=False)
+def get_lister(base_url, token, company_id):
+    """Return a ComponentLister for a known token, shared across reruns so its connection pool is reused."""
+    return ComponentLister.from_token(base_url, token, company_id)
+
+def authenticate(base_url, email, password):
+    """Return a ComponentLister for the account, logging in only when this session holds no live token for it."""
+    key = f"token:{base_url}:{email}"
+    password_digest = hashlib.sha256(password.encode()).hexdigest()
+    cached = st.session_state.get(key)
+    if cached is None or cached[2] <= time.time() or cached[3] != password_digest:
+        lister = ComponentLister(base_url, email, password)
+        st.session_state[key] = (lister.token, lister.company_id, time.time() + TOKEN_TTL_SECONDS, password_digest)
+    token, company_id = st.session_state[key][:2]
+    return get_lister(base_url, token, company_id)
+
+@st.cache_data(ttl=FETCH_CACHE_TTL, show_spinner=False)
+def cached_fetch(_lister, base_url, email, method, args):
+    """Return `_lister.<method>(*args)`, cached per account and arguments.
+
+    The lister itself is not hashed; `base_url` and `email` key the entry so accounts never share results.
+    Callers obtain `_lister` from authenticate, which has already checked the password.
+    """
+    return getattr(_lister, method)(*args)
+
+@st.cache_data(ttl=FETCH_CACHE_TTL, show_spinner=False)
+def cached_fetch_data_managers(_lister, base_url, email, limit, _progress_cb=None):
+    """Like cached_fetch for fetch_all_data_managers. `_progress_cb` is only called on a cache miss."""
+    return _lister.fetch_all_data_managers(limit, progress_cb=_progress_cb)
+
 # Streamlit UI
+# pandas and pyarrow are imported inside the helpers that need them, so the form renders before they load
 st.title("Component Listing Tool")
 
 with st.form("config_form"):
@@ -70,15 +179,27 @@ with st.form("config_form"):
     password = st.text_input("Password", type="password")
     start_date = st.date_input("Start Date", value=None)
     end_date = st.date_input("End Date", value=None)
+    export_format = st.radio("Export Format", ("CSV", "Parquet"), horizontal=True)
     submitted = st.form_submit_button("List Components")
 
+if st.button("Re-login", help="Forget the saved login and fetched lists so the next submit logs in and fetches again"):
+    # Drop this session's tokens, the cached clients built from them and the fetched lists
+    for key in [k for k in st.session_state if str(k).startswith("token:")]:
+        del st.session_state[key]
+    get_lister.clear()
+    cached_fetch.clear()
+    cached_fetch_data_managers.clear()
+    st.info("Saved login and fetched lists cleared. The next submit will log in and fetch again.")
+
 if submitted:
     # Validate required fields
     if not base_url or not email or not password:
         st.error("Base URL, Email, and Password are required.")
     else:
         try:
-            lister = ComponentLister(base_url.strip(), email.strip(), password)
+            base_url = base_url.strip()
+            email = email.strip()
+            lister = authenticate(base_url, email, password)
         except Exception as e:
             st.error(f"Failed to initialize ComponentLister: {e}")
             st.stop()
@@ -94,82 +215,104 @@ if submitted:
 
         end_ts = int(datetime.combine(end_date, datetime.max.time()).timestamp())
 
-        # Prepare full unfiltered data for dependency analysis
-        full_single_exp = []
-        full_multi_exp = []
-        full_dm = []
-        full_vp = []
+        # Exp. manager lists are never looked up during dependency analysis, so they may be narrowed by the
+        # server. DM and VP lists must stay complete because they form the dependency index.
+        exp_range = (start_ts, end_ts) if SERVER_SIDE_DATE_FILTER else (None, None)
 
-        # Fetch components (wrapped to show errors cleanly)
+        # Fetch components concurrently (wrapped to show errors cleanly); the endpoints are independent
+        labels = {
+            "single_exp": "Single Exp. Manager",
+            "multi_exp": "Multiple Exp. Manager",
+            "dm": "Data Manager",
+            "vp": "Visual Programming",
+        }
+        failed = []
+        # Filled from worker threads (list.append is atomic) with one message per table group fetched
+        dm_progress = []
         try:
-            with st.spinner("Fetching Single Exp. Manager components..."):
-                single_exp = lister.fetch_single_exp_manager(DEFAULT_SINGLE_EXP_MANAGER_LIMIT)
-                full_single_exp = single_exp  # keep full data for dependency analysis
-                single_exp = filter_by_updated_at(single_exp, start_ts, end_ts)
-            st.success(f"Fetched {len(single_exp)} Single Exp. Manager components.")
-
-            with st.spinner("Fetching Multiple Exp. Manager components..."):
-                multiple_exp = lister.fetch_multiple_exp_manager(DEFAULT_MULTIPLE_EXP_MANAGER_LIMIT)
-                full_multi_exp = multiple_exp  # keep full data for dependency analysis
-                multiple_exp = filter_by_updated_at(multiple_exp, start_ts, end_ts)
-            st.success(f"Fetched {len(multiple_exp)} Multiple Exp. Manager components.")
-
-            with st.spinner("Fetching Data Manager components..."):
-                data_managers = lister.fetch_all_data_managers(DEFAULT_DATA_MANAGER_LIMIT)
-                full_dm = data_managers  # keep full data for dependency analysis
-                data_managers = filter_by_updated_at(data_managers, start_ts, end_ts)
-            st.success(f"Fetched {len(data_managers)} Data Manager components.")
-
-            with st.spinner("Fetching Visual Programming components..."):
-                vp_exp = lister.fetch_visual_programming(DEFAULT_VISUAL_PROGRAMMING_LIMIT)
-                full_vp = vp_exp  # keep full data for dependency analysis
-                vp_exp = filter_by_updated_at(vp_exp, start_ts, end_ts)
-            st.success(f"Fetched {len(vp_exp)} Visual Programming components.")
+            with st.status("Fetching components...", expanded=True) as status:
+                progress = st.progress(0.0)
+
+                def report(name, error, finished):
+                    if error is None:
+                        status.update(label=f"Fetched {labels[name]} components ({finished}/{len(labels)})")
+                    else:
+                        failed.append(name)
+                        st.error(f"Failed to fetch {labels[name]} components: {error}")
+                    progress.progress(finished / len(labels))
+
+                fetched = run_concurrently({
+                    "single_exp": lambda: cached_fetch(lister, base_url, email, "fetch_single_exp_manager", (DEFAULT_SINGLE_EXP_MANAGER_LIMIT, *exp_range)),
+                    "multi_exp": lambda: cached_fetch(lister, base_url, email, "fetch_multiple_exp_manager", (DEFAULT_MULTIPLE_EXP_MANAGER_LIMIT, *exp_range)),
+                    "dm": lambda: cached_fetch_data_managers(lister, base_url, email, DEFAULT_DATA_MANAGER_LIMIT, dm_progress.append),
+                    "vp": lambda: cached_fetch(lister, base_url, email, "fetch_visual_programming", (DEFAULT_VISUAL_PROGRAMMING_LIMIT,)),
+                }, on_done=report)
+                # One summary line, only when the table groups were actually fetched rather than served from cache
+                if dm_progress:
+                    st.write(f"Fetched data managers for {len(dm_progress)} table groups")
+                status.update(label="Fetched all components", state="complete", expanded=False)
         except Exception as e:
-            st.error(f"Error while fetching components: {e}")
+            # Failed fetches were already shown by report; only surface errors raised outside them
+            if not failed:
+                st.error(f"Error while fetching components: {e}")
             st.stop()
 
-        # Prepare CSVs
-        def to_df(data):
-            return pd.DataFrame([{k: convert_timestamp(v) if k in ("created_at", "updated_at") else v for k, v in item.items()} for item in data])[['id','name','created_at','updated_at']] if data else pd.DataFrame(columns=['id','name','created_at','updated_at'])
-        # Enrich VP components with dependency analysis (uses unfiltered full lists as index)
+        # Keep full data for dependency analysis; the client-side filter below stays as a safety net
+        # for endpoints that ignore the server-side range
+        full_single_exp = fetched["single_exp"]
+        full_multi_exp = fetched["multi_exp"]
+        full_dm = fetched["dm"]
+        full_vp = fetched["vp"]
+
+        single_exp = filter_by_updated_at(full_single_exp, start_ts, end_ts)
+        st.success(f"Fetched {len(single_exp)} Single Exp. Manager components.")
+        multiple_exp = filter_by_updated_at(full_multi_exp, start_ts, end_ts)
+        st.success(f"Fetched {len(multiple_exp)} Multiple Exp. Manager components.")
+        data_managers = filter_by_updated_at(full_dm, start_ts, end_ts)
+        st.success(f"Fetched {len(data_managers)} Data Manager components.")
+        vp_exp = filter_by_updated_at(full_vp, start_ts, end_ts)
+        st.success(f"Fetched {len(vp_exp)} Visual Programming components.")
+
+        # Analyze VP dependencies (uses unfiltered full lists as index)
         try:
             analyst = DependencyAnalyst(full_dm, full_single_exp, full_multi_exp, full_vp)
-            enriched_vp = analyst.analyze_vp_dependencies(vp_exp)
+            vp_exp, vp_deps, vp_missing = analyst.analyze_vp_dependencies(vp_exp)
+            missing = analyst.get_missing_dependencies()
         except Exception as e:
-            # If dependency analysis fails, proceed without enrichment but show a warning
+            # If dependency analysis fails, proceed without dependency columns but show a warning
             st.warning(f"Dependency analysis failed: {e}")
-            enriched_vp = vp_exp
+            vp_deps = vp_missing = [[] for _ in vp_exp]
+            missing = {"component_id": [], "component_name": [], "missing_dependencies": []}
 
         # Prepare CSV files; add Dependencies and Missing Dependencies columns for VPs
-        vp_rows = []
-        for v in enriched_vp:
-            deps = v.get("vp_dependencies") or []
-            missing = v.get("vp_missing_dependencies") or []
-            vp_rows.append({
-                "id": v.get("id"),
-                "name": v.get("name"),
-                "created_at": convert_timestamp(v.get("created_at")),
-                "updated_at": convert_timestamp(v.get("updated_at")),
-                "Dependencies": "\n".join(deps),
-                "Missing Dependencies": "\n".join(missing),
-            })
+        vp_table = to_columns(vp_exp)
+        vp_table["Dependencies"] = ["\n".join(deps) for deps in vp_deps]
+        vp_table["Missing Dependencies"] = ["\n".join(keys) for keys in vp_missing]
+
+        missing_table = {**missing, "missing_dependencies": ["\n".join(m) for m in missing["missing_dependencies"]]}
 
         files = {
-            "single-exp-manager-list.csv": to_df(single_exp),
-            "multiple-exp-manager-list.csv": to_df(multiple_exp),
-            "dm-list.csv": to_df(data_managers),
-            "vp-list.csv": pd.DataFrame(vp_rows),
-            "missing-dependencies.csv": pd.DataFrame(analyst.get_missing_dependencies()),
+            "single-exp-manager-list": to_columns(single_exp),
+            "multiple-exp-manager-list": to_columns(multiple_exp),
+            "dm-list": to_columns(data_managers),
+            "vp-list": vp_table,
+            "missing-dependencies": missing_table,
         }
 
         # Show download button for ZIP
+        ext = "parquet" if export_format == "Parquet" else "csv"
         zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zf:
-            for fname, df in files.items():
-                zf.writestr(fname, df.to_csv(index=False))
+        with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as zf:
+            for name, table in files.items():
+                # Stream each file straight into its compressed entry instead of building it in memory first
+                with zf.open(f"{name}.{ext}", "w") as fh:
+                    try:
+                        write_table(fh, table, export_format)
+                    except RuntimeError as e:
+                        st.error(f"Failed to write {name}.{ext}: {e}")
+                        st.stop()
         st.download_button(
-            label="Download All CSVs as ZIP",
+            label=f"Download All {export_format} Files as ZIP",
             data=zip_buffer.getvalue(),
             file_name="component_lists.zip",
             mime="application/zip"
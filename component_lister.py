@@ -1,14 +1,69 @@
 import os
 import json
+import math
+import itertools
+import functools
 import requests
-from urllib.parse import urljoin
-import streamlit as st
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+import urllib3
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+try:
+    # ijson picks its fastest available backend (yajl2_c when compiled) on import
+    import ijson
+    JSON_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    JSON_ERRORS = (ValueError,)
+
+# Default upper bound on in-flight requests when a fetch fans out over independent pages;
+# overridden by MAX_CONCURRENT_REQUESTS in the environment
+MAX_CONCURRENT_REQUESTS = 16
+
+# Listing fetches only keep these keys per item (VP keeps everything; dependency analysis needs its actions/trigger)
+LIST_FIELDS = ("id", "name", "created_at", "updated_at")
+TABLEGROUP_FIELDS = ("id", "name")
+# Extra keys VP items need for dependency analysis, on top of LIST_FIELDS
+VP_DEPENDENCY_FIELDS = ("actions", "trigger")
+
+
+def json_dumps(obj) -> str:
+    """Serialize `obj` to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def json_loads(data):
+    """Parse JSON from bytes or str, using orjson when it is installed. Raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def extract_items(doc, prefix):
+    """Return the list found at ijson-style `prefix` (e.g. "data.item") in an already parsed document."""
+    node = doc
+    for key in prefix.split(".")[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+    return node or []
+
+
+@functools.lru_cache(maxsize=None)
 def require_env(name: str) -> str:
     """Return the value of environment variable `name` or raise a RuntimeError with guidance.
 
     Endpoints are considered confidential and must be provided via the application's .env file.
+    Values are cached after the first successful lookup (.env is loaded once at startup); a missing
+    variable is looked up again on the next call.
     """
     val = os.getenv(name)
     if not val:
@@ -19,19 +74,27 @@ def require_env(name: str) -> str:
     return val
 
 
+# Component endpoints, resolved from "<NAME>_ENDPOINT" environment variables
+COMPONENT_ENDPOINTS = ("SINGLE_EXP_MANAGER", "MULTIPLE_EXP_MANAGER", "TABLEGROUP", "DATA_MANAGER", "VISUAL_PROGRAMMING")
+
+
 class ComponentLister:
+    __slots__ = (
+        "base_url", "session", "headers", "company_id", "_endpoints", "_workers", "_chunk_size",
+        "_list_projection", "_vp_projection", "_sort_str", "_filter_str",
+    )
+
     def __init__(self, base_url: str, email: str, password: str):
         """
         Initialize ComponentLister by logging in (to obtain a token) and fetching company_id.
 
         Raises RuntimeError on unrecoverable errors so caller can handle UI feedback.
         """
-        self.base_url = self._prepare_base_url(base_url)
-        self.session = requests.Session()
+        self._open_session(base_url)
 
         # --- Login / obtain token ---
         login_endpoint = require_env("LOGIN_ENDPOINT")
-        login_url = urljoin(self.base_url, login_endpoint)
+        login_url = self._url(login_endpoint)
         login_body = {"email": email, "password": password}
 
         try:
@@ -41,7 +104,7 @@ class ComponentLister:
             raise RuntimeError(f"Login request failed: {e}") from e
 
         try:
-            login_json = resp.json()
+            login_json = json_loads(resp.content)
         except ValueError as e:
             raise RuntimeError("Login response is not valid JSON") from e
 
@@ -56,20 +119,11 @@ class ComponentLister:
         if not token:
             raise RuntimeError("Login succeeded but token was not found in the response")
 
-        # Normalize token to include Bearer prefix if missing
-        if not token.lower().startswith("bearer"):
-            token = f"Bearer {token}"
-
-        # Set default headers for subsequent requests
-        self.headers = {
-            "accept": "application/json, text/plain, */*",
-            "authorization": token,
-        }
-        self.session.headers.update(self.headers)
+        self._set_token(token)
 
         # --- Fetch company_id ---
         apps_endpoint = require_env("APPLICATION_PAGES_ENDPOINT")
-        apps_url = urljoin(self.base_url, apps_endpoint)
+        apps_url = self._url(apps_endpoint)
         apps_params = {"page": 1, "limit": 1, "column": "updated_at", "sort": "desc"}
 
         try:
@@ -79,7 +133,7 @@ class ComponentLister:
             raise RuntimeError(f"Failed to fetch application pages to determine company_id: {e}") from e
 
         try:
-            apps_json = apps_resp.json()
+            apps_json = json_loads(apps_resp.content)
         except ValueError as e:
             raise RuntimeError("Applications response is not valid JSON") from e
 
@@ -98,98 +152,268 @@ class ComponentLister:
         if not company_id:
             raise RuntimeError("Unable to determine company_id from applications response")
 
+        self._set_company(company_id)
+
+    @classmethod
+    def from_token(cls, base_url: str, token: str, company_id):
+        """
+        Build a ComponentLister from a token and company_id obtained by an earlier login.
+
+        Skips the login and application pages round-trips; no request is sent until a fetch is made.
+        """
+        self = cls.__new__(cls)
+        self._open_session(base_url)
+        self._set_token(token)
+        self._set_company(company_id)
+        return self
+
+    @property
+    def token(self):
+        return self.headers["authorization"]
+
+    def _open_session(self, base_url):
+        self.base_url = self._prepare_base_url(base_url)
+        # Endpoints are static, so join them once rather than on every request
+        self._endpoints = {name: self._url(require_env(f"{name}_ENDPOINT")) for name in COMPONENT_ENDPOINTS}
+        # Settings are read at construction time (app.py loads .env after importing this module), not per fetch
+        self._workers = int(os.getenv("MAX_CONCURRENT_REQUESTS", MAX_CONCURRENT_REQUESTS))
+        self._chunk_size = int(os.getenv("MULTIPLE_EXP_MANAGER_CHUNK_SIZE", "200"))
+        if self._chunk_size <= 0:
+            raise RuntimeError(f"MULTIPLE_EXP_MANAGER_CHUNK_SIZE must be a positive integer, got {self._chunk_size}")
+        # Optional server-side projection so the API only returns the fields we keep; empty when disabled
+        if os.getenv("API_PROJECTION", "false").strip().lower() in ("1", "true", "yes"):
+            self._list_projection = {"projection": json_dumps({field: 1 for field in LIST_FIELDS})}
+            self._vp_projection = {"projection": json_dumps({field: 1 for field in LIST_FIELDS + VP_DEPENDENCY_FIELDS})}
+        else:
+            self._list_projection = {}
+            self._vp_projection = {}
+        # Keep-alive pool size: both fan-outs (multi-exp pages, DM table groups) at full width plus the four
+        # top-level fetches. Anything beyond it waits for a pooled connection rather than opening a new one.
+        pool_size = 2 * self._workers + 4
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            # The POST endpoints used here (login, table groups, data managers) only authenticate or query, so they
+            # are safe to retry alongside the idempotent methods
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+
+    def _set_token(self, token):
+        # Normalize token to include Bearer prefix if missing
+        if not token.lower().startswith("bearer"):
+            token = f"Bearer {token}"
+
+        # Set default headers for subsequent requests
+        self.headers = {
+            "accept": "application/json, text/plain, */*",
+            # "gzip, deflate", plus "br" when the brotli package is installed so urllib3 can decode it
+            "accept-encoding": DEFAULT_ACCEPT_ENCODING,
+            "authorization": token,
+        }
+        self.session.headers.update(self.headers)
+
+    def _set_company(self, company_id):
         self.company_id = company_id
 
+        # Query strings shared by every fetch; serialized once instead of per request
+        self._sort_str = json_dumps({"updated_at": -1})
+        self._filter_str = json_dumps(self._build_filter())
+
     def _prepare_base_url(self, url):
         url = url.rstrip("/")
         url = url.replace("studio", "gateway")
         return url + "/"
 
-    def _build_filter(self):
-        return {"company_id": self.company_id}
+    def _url(self, endpoint):
+        # base_url always ends with "/" and endpoints are relative paths, so plain concatenation is enough
+        return self.base_url + endpoint.lstrip("/")
+
+    def _build_filter(self, updated_from=None, updated_to=None):
+        """Build the Mongo-style `filter` query; optional bounds restrict `updated_at` on the server side."""
+        query = {"company_id": self.company_id}
+        updated_at = {}
+        if updated_from is not None:
+            updated_at["$gte"] = updated_from
+        if updated_to is not None:
+            updated_at["$lte"] = updated_to
+        if updated_at:
+            query["updated_at"] = updated_at
+        return query
 
-    def _make_request(self, endpoint, method="GET", params=None, json_data=None):
-        url = urljoin(self.base_url, endpoint)
+    def _filter_param(self, updated_from=None, updated_to=None):
+        if updated_from is None and updated_to is None:
+            return self._filter_str
+        return json_dumps(self._build_filter(updated_from, updated_to))
+
+    def _make_request(self, url, method="GET", params=None, json_data=None, prefix=None, fields=None):
+        """
+        Send a request and return the decoded JSON body.
+
+        When `prefix` is given (ijson syntax, e.g. "data.item") only the items under it are returned, as a list.
+        They are streamed off the socket with ijson when it is installed, and trimmed to `fields` when given.
+        """
+        stream = prefix is not None and ijson is not None
         try:
             if method == "GET":
-                response = self.session.get(url, params=params, timeout=30)
+                response = self.session.get(url, params=params, timeout=30, stream=stream)
             elif method == "POST":
-                response = self.session.post(url, params=params, json=json_data, timeout=30)
+                response = self.session.post(url, params=params, json=json_data, timeout=30, stream=stream)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             response.raise_for_status()
         except requests.HTTPError as e:
+            response.close()
             # Raise errors to be handled by the UI layer
-            raise RuntimeError(f"HTTP error fetching {endpoint}: {e} (status {getattr(e.response, 'status_code', 'N/A')})") from e
+            raise RuntimeError(f"HTTP error fetching {url}: {e} (status {getattr(e.response, 'status_code', 'N/A')})") from e
         except requests.RequestException as e:
-            raise RuntimeError(f"Network error fetching {endpoint}: {e}") from e
+            raise RuntimeError(f"Network error fetching {url}: {e}") from e
         try:
-            return response.json()
-        except ValueError as e:
-            raise RuntimeError(f"Invalid JSON response from {endpoint}") from e
+            if prefix is None:
+                return json_loads(response.content)
+            if stream:
+                # Let urllib3 undo any content-encoding so ijson reads plain JSON bytes
+                response.raw.decode_content = True
+                items = ijson.items(response.raw, prefix, use_float=True)
+            else:
+                items = extract_items(json_loads(response.content), prefix)
+            if fields is not None:
+                return [{k: item.get(k) for k in fields} for item in items]
+            return list(items)
+        except JSON_ERRORS as e:
+            raise RuntimeError(f"Invalid JSON response from {url}") from e
+        # ijson reads response.raw directly, so failures mid-body surface as urllib3 errors rather than requests ones
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            raise RuntimeError(f"Network error fetching {url}: {e}") from e
+        finally:
+            response.close()
 
-    def fetch_single_exp_manager(self, limit):
+    def _parallel_pages(self, url, pages, build_params, page_size=None, fields=None, workers=None):
+        """
+        GET each page number in `pages` with `build_params(page)` and return the items of all pages in page order.
+
+        Pages are independent, so they are requested concurrently in batches of `workers` (default: the lister's
+        concurrency limit) over the shared session.
+        When `page_size` is given, a page shorter than it ends the listing and later batches are never sent.
+        """
+        workers = workers or self._workers
+        pages = list(pages)
+        data = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_start in range(0, len(pages), workers):
+                batch = pages[batch_start:batch_start + workers]
+                results = executor.map(
+                    lambda page: self._make_request(url, "GET", params=build_params(page), prefix="data.item", fields=fields),
+                    batch,
+                )
+                for page_data in results:
+                    data.extend(page_data)
+                    if page_size is not None and len(page_data) < page_size:
+                        return data
+        return data
+
+    def fetch_single_exp_manager(self, limit, updated_from=None, updated_to=None):
         params = {
             "limit": limit,
             "page": 1,
-            "sort": json.dumps({"updated_at": -1}),
-            "filter": json.dumps(self._build_filter()),
+            "sort": self._sort_str,
+            "filter": self._filter_param(updated_from, updated_to),
+            **self._list_projection,
         }
-        endpoint = require_env("SINGLE_EXP_MANAGER_ENDPOINT")
-        resp = self._make_request(endpoint, "GET", params=params)
-        return resp.get("data", [])
+        url = self._endpoints["SINGLE_EXP_MANAGER"]
+        return self._make_request(url, "GET", params=params, prefix="data.item", fields=LIST_FIELDS)
 
-    def fetch_multiple_exp_manager(self, limit):
-        chunk_size = 10
-        pages = limit // chunk_size + (1 if limit % chunk_size != 0 else 0)
-        data = []
-        endpoint = require_env("MULTIPLE_EXP_MANAGER_ENDPOINT")
-        for page in range(1, pages + 1):
-            params = {
-                "limit": chunk_size,
+    def fetch_multiple_exp_manager(self, limit, updated_from=None, updated_to=None):
+        if limit <= 0:
+            return []
+        chunk_size = min(self._chunk_size, limit)
+        url = self._endpoints["MULTIPLE_EXP_MANAGER"]
+        filter_str = self._filter_param(updated_from, updated_to)
+
+        def page_params(page, size):
+            return {
+                "limit": size,
                 "page": page,
-                "sort": json.dumps({"updated_at": -1}),
-                "filter": json.dumps(self._build_filter()),
+                "sort": self._sort_str,
+                "filter": filter_str,
+                **self._list_projection,
             }
-            resp = self._make_request(endpoint, "GET", params=params)
-            data.extend(resp.get("data", []))
-        return data
+
+        def fetch_page(page, size):
+            return self._make_request(url, "GET", params=page_params(page, size), prefix="data.item", fields=LIST_FIELDS)
+
+        # Probe with the first page. A short page means the list is exhausted or the server caps the page size;
+        # one more page at the observed size tells the two apart.
+        data = fetch_page(1, chunk_size)
+        next_page = 2
+        if len(data) < chunk_size:
+            if not data:
+                return data
+            chunk_size = len(data)
+            second = fetch_page(2, chunk_size)
+            data.extend(second)
+            if len(second) < chunk_size:
+                return data[:limit]
+            next_page = 3
+
+        pages = math.ceil(limit / chunk_size)
+        data.extend(self._parallel_pages(
+            url, range(next_page, pages + 1), lambda page: page_params(page, chunk_size),
+            page_size=chunk_size, fields=LIST_FIELDS,
+        ))
+        # The last page is requested whole, so trim the overshoot when limit is not a multiple of the page size
+        return data[:limit]
 
     def fetch_tablegroups(self, limit):
-        endpoint = require_env("TABLEGROUP_ENDPOINT")
+        url = self._endpoints["TABLEGROUP"]
         json_data = {
             "limit": limit,
             "page": 1,
-            "sort": json.dumps({"updated_at": -1}),
+            "sort": self._sort_str,
             "search": "",
         }
-        resp = self._make_request(endpoint, "POST", json_data=json_data)
-        return resp.get("data", [])
+        return self._make_request(url, "POST", json_data=json_data, prefix="data.item", fields=TABLEGROUP_FIELDS)
 
     def fetch_data_manager_by_tablegroup(self, tablegroup_id, limit):
-        endpoint = require_env("DATA_MANAGER_ENDPOINT")
-        json_data = {"tablegroup_id": tablegroup_id, "search": ""}
-        resp = self._make_request(endpoint, "POST", json_data=json_data)
-        return resp.get("data", [])
+        url = self._endpoints["DATA_MANAGER"]
+        json_data = {"tablegroup_id": tablegroup_id, "search": "", **self._list_projection}
+        return self._make_request(url, "POST", json_data=json_data, prefix="data.item", fields=LIST_FIELDS)
+
+    def fetch_all_data_managers(self, limit, progress_cb: Optional[Callable[[str], None]] = None):
+        """
+        Fetch the data managers of every table group.
 
-    def fetch_all_data_managers(self, limit):
+        `progress_cb`, when given, is called with a message for each table group. It runs on the worker threads,
+        so it must be thread-safe (e.g. list.append) and must not touch Streamlit.
+        """
         tablegroups = self.fetch_tablegroups(limit)
-        all_data_managers = []
-        for tg in tablegroups:
-            tg_id = tg.get("id")
-            tg_name = tg.get("name")
-            st.write(f"Fetching data managers for table group: {tg_name}")
-            data_managers = self.fetch_data_manager_by_tablegroup(tg_id, limit)
-            all_data_managers.extend(data_managers)
-        return all_data_managers
-
-    def fetch_visual_programming(self, limit):
+
+        def fetch(tg):
+            if progress_cb is not None:
+                progress_cb(f"Fetching data managers for table group: {tg.get('name')}")
+            return self.fetch_data_manager_by_tablegroup(tg.get("id"), limit)
+
+        # One request per table group; they are independent so fan them out
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            data_managers = list(itertools.chain.from_iterable(executor.map(fetch, tablegroups)))
+        return data_managers
+
+    def fetch_visual_programming(self, limit, updated_from=None, updated_to=None):
         params = {
             "limit": limit,
             "page": 1,
-            "sort": json.dumps({"updated_at": -1}),
-            "filter": json.dumps(self._build_filter()),
+            "sort": self._sort_str,
+            "filter": self._filter_param(updated_from, updated_to),
+            **self._vp_projection,
         }
-        endpoint = require_env("VISUAL_PROGRAMMING_ENDPOINT")
-        resp = self._make_request(endpoint, "GET", params=params)
-        return resp.get("data", [])
+        url = self._endpoints["VISUAL_PROGRAMMING"]
+        return self._make_request(url, "GET", params=params, prefix="data.item")
@@ -8,6 +8,15 @@ class DependencyAnalyst:
     JOB_PREFIX = "job^"
     DJOB_PREFIX = "djob^"
 
+    # VP trigger/action types that target another VP by name: type -> (key holding the target, index prefix)
+    NAMED_VP_TYPES = {
+        "function": ("function", FUNCTION_PREFIX),
+        "job": ("job", JOB_PREFIX),
+        "dedicated_job": ("dedicated_job", DJOB_PREFIX),
+    }
+    # VP action types that reference a data manager through form_data_id
+    DM_ACTION_TYPES = frozenset({"find_record", "find_records", "create_record", "create_records", "update_record", "delete_record"})
+
     def __init__(self, full_dm_data, full_single_exp_data, full_multi_exp_data, full_vp_data):
         """
         Initialize DependencyAnalyst by indexing full data (unfiltered) of each component to identify missing dependencies.
@@ -22,84 +31,68 @@ class DependencyAnalyst:
         - Dedicated Job VP: djob^{name}
         """
         # indexing components based on type for searching efficiency
-        self.indexed_component_list = {}
-        for dm in full_dm_data:
-            key = self.DM_PREFIX + str(dm["id"])
-            self.indexed_component_list[key] = dm
-        for single_exp in full_single_exp_data:
-            key = self.SINGLE_EXP_PREFIX + str(single_exp["id"])
-            self.indexed_component_list[key] = single_exp
-        for multi_exp in full_multi_exp_data:
-            key = self.MULTI_EXP_PREFIX + str(multi_exp["id"])
-            self.indexed_component_list[key] = multi_exp
+        index = {f"{self.DM_PREFIX}{dm['id']}": dm for dm in full_dm_data}
+        index.update({f"{self.SINGLE_EXP_PREFIX}{single_exp['id']}": single_exp for single_exp in full_single_exp_data})
+        index.update({f"{self.MULTI_EXP_PREFIX}{multi_exp['id']}": multi_exp for multi_exp in full_multi_exp_data})
         for vp in full_vp_data:
             # Defensive trigger parsing. Skip API triggers as targets (per design decision).
+            # Note: we intentionally do NOT index API triggers (api_v2) as searchable targets.
             trigger = vp.get("trigger") or {}
-            ttype = trigger.get("type")
-            key = None
-            if ttype == "function":
-                name = (trigger.get("function") or {}).get("name")
-                if name:
-                    key = self.FUNCTION_PREFIX + str(name)
-            elif ttype == "job":
-                name = (trigger.get("job") or {}).get("name")
+            spec = self.NAMED_VP_TYPES.get(trigger.get("type"))
+            if spec is not None:
+                target_key, prefix = spec
+                name = (trigger.get(target_key) or {}).get("name")
                 if name:
-                    key = self.JOB_PREFIX + str(name)
-            elif ttype == "dedicated_job":
-                name = (trigger.get("dedicated_job") or {}).get("name")
-                if name:
-                    key = self.DJOB_PREFIX + str(name)
-            # Note: we intentionally do NOT index API triggers (api_v2) as searchable targets.
-            if key is not None:
-                self.indexed_component_list[key] = vp
+                    index[f"{prefix}{name}"] = vp
+        self.indexed_component_list = index
 
-        # define array to store missing dependencies
-        self.missing_dependencies = []
+        # store missing dependencies column-wise (one entry per analyzed VP) so they load straight into a table
+        self.missing_dependencies = {"component_id": [], "component_name": [], "missing_dependencies": []}
 
     def analyze_vp_dependencies(self, vp_data):
+        """
+        Resolve the dependencies of each VP in `vp_data` without modifying the VP dicts.
+
+        Returns (vp_data, dependencies, missing_dependencies), where the last two are lists aligned with vp_data
+        holding each VP's dependency keys and the subset of them not found in the index.
+        """
+        index = self.indexed_component_list
+        dependencies = []
+        missing_dependencies = []
         for vp in vp_data:
             vp_dependencies = []
-            vp_missing_dependencies = []
             vp_actions = vp.get("actions") or []
             for action in vp_actions:
                 search_key = None
                 a_type = action.get("type")
+                spec = self.NAMED_VP_TYPES.get(a_type)
                 # Functions and jobs (including dedicated jobs)
-                if a_type == "function":
-                    name = (action.get("function") or {}).get("name")
-                    if name:
-                        search_key = self.FUNCTION_PREFIX + str(name)
-                elif a_type == "job":
-                    name = (action.get("job") or {}).get("name")
+                if spec is not None:
+                    target_key, prefix = spec
+                    name = (action.get(target_key) or {}).get("name")
                     if name:
-                        search_key = self.JOB_PREFIX + str(name)
-                elif a_type == "dedicated_job":
-                    name = (action.get("dedicated_job") or {}).get("name")
-                    if name:
-                        search_key = self.DJOB_PREFIX + str(name)
+                        search_key = f"{prefix}{name}"
                 # Data manager related actions that reference a form_data_id
-                elif a_type in ("find_record", "find_records", "create_record", "create_records", "update_record", "delete_record"):
+                elif a_type in self.DM_ACTION_TYPES:
                     fid = action.get("form_data_id")
                     if fid is not None:
-                        search_key = self.DM_PREFIX + str(fid)
+                        search_key = f"{self.DM_PREFIX}{fid}"
                 # NOTE: per instruction, do NOT try to resolve API endpoints as target dependencies
                 # (skip action types that call APIs)
                 if search_key is not None:
-                    search_component = self.indexed_component_list.get(search_key)
                     vp_dependencies.append(search_key)
-                    if search_component is None:
-                        vp_missing_dependencies.append(search_key)
+
+            # resolve against the index once, after collecting
+            vp_missing_dependencies = [key for key in vp_dependencies if key not in index]
 
             # storing dependency list
-            self.missing_dependencies.append({
-                "component_id": vp.get("id"),
-                "component_name": vp.get("name"),
-                "missing_dependencies": vp_missing_dependencies,
-            })
-            vp["vp_dependencies"] = vp_dependencies
-            vp["vp_missing_dependencies"] = vp_missing_dependencies
-        
-        return vp_data
+            self.missing_dependencies["component_id"].append(vp.get("id"))
+            self.missing_dependencies["component_name"].append(vp.get("name"))
+            self.missing_dependencies["missing_dependencies"].append(vp_missing_dependencies)
+            dependencies.append(vp_dependencies)
+            missing_dependencies.append(vp_missing_dependencies)
+
+        return vp_data, dependencies, missing_dependencies
     
     def get_missing_dependencies(self):
         return self.missing_dependencies
\ No newline at end of file